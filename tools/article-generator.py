@@ -8,15 +8,39 @@
 import os
 import json
 import re
+import sys
+from concurrent.futures import ProcessPoolExecutor, as_completed
 from datetime import datetime
+from functools import lru_cache
 from typing import Dict, List
 
+
+def _create_one(base_dir: str, config: Dict) -> str:
+    """工作行程入口：各自建立ArticleGenerator，避免跨行程共享狀態"""
+    return ArticleGenerator(base_dir).create_article(**config)
+
+
+@lru_cache(maxsize=256)
+def _default_content(title: str) -> str:
+    """組裝預設內容（批量中同標題重複時直接命中快取）"""
+    return (ArticleGenerator._DEFAULT_CONTENT_PREFIX + title
+            + ArticleGenerator._DEFAULT_CONTENT_SUFFIX)
+
 class ArticleGenerator:
+    # 模板佔位符格式：{{PLACEHOLDER_NAME}}
+    _PLACEHOLDER_RE = re.compile(r"\{\{([A-Z_]+)\}\}")
+
+    # 檔名清理用正則（一次編譯，批量生成時重複使用）
+    _RE_STRIP = re.compile(r'[^\w\s-]')
+    _RE_DASH = re.compile(r'[-\s]+')
+
     def __init__(self, base_dir: str = "."):
         self.base_dir = base_dir
         self.template_path = os.path.join(base_dir, "templates", "article-template.html")
         self.articles_dir = os.path.join(base_dir, "articles")
-        self.index_file = os.path.join(base_dir, "tools", "articles-index.json")
+        self.index_file = os.path.join(base_dir, "tools", "articles-index.jsonl")
+        self.index_meta_file = os.path.join(base_dir, "tools", "index-meta.json")
+        self.legacy_index_file = os.path.join(base_dir, "tools", "articles-index.json")
 
         # 文章分類配置
         self.categories = {
@@ -62,8 +86,29 @@ class ArticleGenerator:
             }
         }
 
+        # 子分類驗證用集合（list線性掃描改為O(1)查找；
+        # categories本身保持list以便寫入JSON索引）
+        self._subcategories = {
+            cat: frozenset(info["subcategories"])
+            for cat, info in self.categories.items()
+        }
+
         self.ensure_directories()
 
+        # 索引快取：(mtime, data)，檔案未變動時免去重複解析
+        self._index_cache = None
+
+        # 模板片段快取：批量生成時只讀取並解析模板一次
+        self._template_segments = None
+        if os.path.exists(self.template_path):
+            self._load_template()
+
+    def _load_template(self):
+        """讀取模板並快取切割後的片段"""
+        with open(self.template_path, 'r', encoding='utf-8') as f:
+            template = f.read()
+        self._template_segments = self._PLACEHOLDER_RE.split(template)
+
     def ensure_directories(self):
         """確保必要的目錄存在"""
         os.makedirs(os.path.join(self.base_dir, "templates"), exist_ok=True)
@@ -74,14 +119,19 @@ class ArticleGenerator:
             category_dir = os.path.join(self.articles_dir, category)
             os.makedirs(category_dir, exist_ok=True)
 
+    @staticmethod
+    def _write_text(path: str, text: str):
+        """編碼一次後以二進位寫入，避開文字模式的增量編碼器"""
+        with open(path, 'wb') as f:
+            f.write(text.encode('utf-8'))
+
     def generate_filename(self, category: str, subcategory: str, title: str, date: str = None) -> str:
         """生成文章檔名"""
         if not date:
             date = datetime.now().strftime("%Y%m%d")
 
         # 清理標題，移除特殊字符
-        clean_title = re.sub(r'[^\w\s-]', '', title).strip()
-        clean_title = re.sub(r'[-\s]+', '-', clean_title)
+        clean_title = self._RE_DASH.sub('-', self._RE_STRIP.sub('', title).strip())
 
         return f"{category}-{subcategory}-{clean_title}-{date}.html"
 
@@ -100,42 +150,48 @@ class ArticleGenerator:
         if category not in self.categories:
             raise ValueError(f"Unknown category: {category}")
 
-        if subcategory not in self.categories[category]["subcategories"]:
+        if subcategory not in self._subcategories[category]:
             raise ValueError(f"Unknown subcategory: {subcategory}")
 
-        # 讀取模板
-        with open(self.template_path, 'r', encoding='utf-8') as f:
-            template = f.read()
+        # 使用快取的模板片段（[文字, 佔位符名稱, 文字, ...] 交錯排列）
+        if self._template_segments is None:
+            self._load_template()
+        segments = self._template_segments
 
         # 生成檔名和日期
         today = datetime.now().strftime("%Y-%m-%d")
         filename = self.generate_filename(category, subcategory, title)
 
+        # 快速路徑：模板不含任何佔位符時不需準備替換內容
+        if len(segments) == 1:
+            self._write_text(os.path.join(self.base_dir, filename), segments[0])
+            self.update_index(filename, title, category, subcategory, today)
+            return filename
+
         # 準備替換內容
         replacements = {
-            "{{ARTICLE_TITLE}}": title,
-            "{{ARTICLE_DESCRIPTION}}": description or f"{title} - 專業律師為您詳細解析",
-            "{{ARTICLE_KEYWORDS}}": ", ".join(keywords) if keywords else f"{title}, 法律, 律師, 法律諮詢",
-            "{{ARTICLE_FILENAME}}": filename,
-            "{{ARTICLE_SUBTITLE}}": subtitle or "專業律師為您詳細解析相關法律問題",
-            "{{CATEGORY_NAME}}": self.categories[category]["name"],
-            "{{CATEGORY_PAGE}}": self.categories[category]["page"],
-            "{{PUBLISH_DATE}}": today,
-            "{{MODIFIED_DATE}}": today,
-            "{{TABLE_OF_CONTENTS}}": self.format_table_of_contents(table_of_contents),
-            "{{ARTICLE_CONTENT}}": content or self.generate_default_content(title),
-            "{{RELATED_ARTICLES}}": self.format_related_articles(related_articles)
+            "ARTICLE_TITLE": title,
+            "ARTICLE_DESCRIPTION": description or f"{title} - 專業律師為您詳細解析",
+            "ARTICLE_KEYWORDS": ", ".join(keywords) if keywords else f"{title}, 法律, 律師, 法律諮詢",
+            "ARTICLE_FILENAME": filename,
+            "ARTICLE_SUBTITLE": subtitle or "專業律師為您詳細解析相關法律問題",
+            "CATEGORY_NAME": self.categories[category]["name"],
+            "CATEGORY_PAGE": self.categories[category]["page"],
+            "PUBLISH_DATE": today,
+            "MODIFIED_DATE": today,
+            "TABLE_OF_CONTENTS": self.format_table_of_contents(table_of_contents),
+            "ARTICLE_CONTENT": content or self.generate_default_content(title),
+            "RELATED_ARTICLES": self.format_related_articles(related_articles)
         }
 
-        # 執行替換
-        article_html = template
-        for placeholder, value in replacements.items():
-            article_html = article_html.replace(placeholder, value)
+        # 單次掃描完成替換：奇數索引片段為佔位符名稱
+        article_html = "".join(
+            replacements.get(seg, seg) if i % 2 else seg
+            for i, seg in enumerate(segments)
+        )
 
         # 寫入檔案
-        article_path = os.path.join(self.base_dir, filename)
-        with open(article_path, 'w', encoding='utf-8') as f:
-            f.write(article_html)
+        self._write_text(os.path.join(self.base_dir, filename), article_html)
 
         # 更新索引
         self.update_index(filename, title, category, subcategory, today)
@@ -147,14 +203,15 @@ class ArticleGenerator:
         if not toc:
             toc = ["法律概念說明", "相關法條解析", "實務案例分享", "常見問題解答", "專業建議"]
 
-        html = ""
+        parts = []
         for i, item in enumerate(toc, 1):
-            html += f'''
+            anchor = item.replace(' ', '-').lower()
+            parts.append(f'''
                     <div class="flex items-start">
                         <span class="inline-flex items-center justify-center w-8 h-8 bg-accent-gold text-primary-dark rounded-full text-sm font-bold mr-3 flex-shrink-0">{i}</span>
-                        <a href="#{item.replace(' ', '-').lower()}" class="text-primary-dark hover:text-accent-gold font-medium">{item}</a>
-                    </div>'''
-        return html
+                        <a href="#{anchor}" class="text-primary-dark hover:text-accent-gold font-medium">{item}</a>
+                    </div>''')
+        return "".join(parts)
 
     def format_related_articles(self, articles: List[str] = None) -> str:
         """格式化相關文章"""
@@ -165,23 +222,22 @@ class ArticleGenerator:
                     <p class="text-gray-600">更多精彩內容即將推出...</p>
                 </div>'''
 
-        html = ""
-        for article in articles[:3]:  # 限制3篇
-            html += f'''
+        parts = [f'''
                 <div class="bg-white p-6 shadow-sm border hover:shadow-md transition-shadow">
                     <h3 class="text-xl font-bold text-primary-dark mb-3">
                         <a href="{article['link']}" class="hover:text-accent-gold">{article['title']}</a>
                     </h3>
                     <p class="text-gray-600 mb-4">{article['description']}</p>
                     <a href="{article['link']}" class="text-accent-gold hover:text-yellow-600 font-medium">閱讀更多 →</a>
-                </div>'''
-        return html
+                </div>''' for article in articles[:3]]  # 限制3篇
+        return "".join(parts)
 
-    def generate_default_content(self, title: str) -> str:
-        """生成預設內容結構"""
-        return f'''
+    # 預設內容只插入一次標題，預先切成前後兩段常數避免每次重組f-string
+    _DEFAULT_CONTENT_PREFIX = '''
             <h2 id="法律概念說明">法律概念說明</h2>
-            <p>關於{title}的基本法律概念和重要性...</p>
+            <p>關於'''
+
+    _DEFAULT_CONTENT_SUFFIX = '''的基本法律概念和重要性...</p>
 
             <h2 id="相關法條解析">相關法條解析</h2>
             <p>相關的法律條文詳細解析...</p>
@@ -196,9 +252,32 @@ class ArticleGenerator:
             <p>律師的專業建議和注意事項...</p>
         '''
 
+    def generate_default_content(self, title: str) -> str:
+        """生成預設內容結構"""
+        return _default_content(title)
+
+    def _migrate_legacy_index(self):
+        """舊版單一JSON索引一次性轉出為JSONL（首次追加前播種，避免丟失既有索引）"""
+        if os.path.exists(self.index_file) or not os.path.exists(self.legacy_index_file):
+            return
+        with open(self.legacy_index_file, 'r', encoding='utf-8') as f:
+            articles = json.load(f).get("articles", [])
+        # 先寫進各行程專屬的temp檔，再以os.link原子性認領目標檔名：
+        # 多個行程同時遷移時恰好一個連結成功，其餘落回一般追加，不會重複播種
+        tmp_path = f"{self.index_file}.{os.getpid()}.migrate"
+        with open(tmp_path, 'wb') as f:
+            for article in articles:
+                f.write((json.dumps(article, separators=(',', ':')) + "\n").encode('utf-8'))
+        try:
+            os.link(tmp_path, self.index_file)
+        except FileExistsError:
+            pass  # 另一個行程已完成遷移
+        finally:
+            os.unlink(tmp_path)
+
     def update_index(self, filename: str, title: str, category: str, subcategory: str, date: str):
-        """更新文章索引"""
-        index_data = self.load_index()
+        """更新文章索引（JSONL追加一行，避免整份索引重寫）"""
+        self._migrate_legacy_index()
 
         article_info = {
             "filename": filename,
@@ -209,29 +288,77 @@ class ArticleGenerator:
             "url": f"https://lawyer880.com/{filename}"
         }
 
-        index_data["articles"].append(article_info)
-        index_data["total_articles"] = len(index_data["articles"])
-        index_data["last_updated"] = datetime.now().isoformat()
-
-        self.save_index(index_data)
+        with open(self.index_file, 'ab') as f:
+            f.write((json.dumps(article_info, separators=(',', ':')) + "\n").encode('utf-8'))
+        self._index_cache = None
 
     def load_index(self) -> Dict:
-        """載入文章索引"""
-        if os.path.exists(self.index_file):
+        """載入文章索引（逐行讀取JSONL，檔案未變動時重用快取）"""
+        try:
+            mtime = os.path.getmtime(self.index_file)
+        except OSError:
+            mtime = None
+
+        if self._index_cache is not None and self._index_cache[0] == mtime:
+            return self._index_cache[1]
+
+        articles = []
+
+        if mtime is not None:
             with open(self.index_file, 'r', encoding='utf-8') as f:
-                return json.load(f)
-        else:
-            return {
-                "articles": [],
-                "total_articles": 0,
-                "categories": self.categories,
-                "last_updated": datetime.now().isoformat()
-            }
+                for line in f:
+                    line = line.strip()
+                    if line:
+                        articles.append(json.loads(line))
+        elif os.path.exists(self.legacy_index_file):
+            # 相容舊版單一JSON索引
+            with open(self.legacy_index_file, 'r', encoding='utf-8') as f:
+                articles = json.load(f).get("articles", [])
+
+        # 分類名稱在數千篇文章間高度重複，intern後堆積只留一份字串
+        for article in articles:
+            if "category" in article:
+                article["category"] = sys.intern(article["category"])
+            if "subcategory" in article:
+                article["subcategory"] = sys.intern(article["subcategory"])
+
+        last_updated = datetime.now().isoformat()
+        if os.path.exists(self.index_meta_file):
+            with open(self.index_meta_file, 'r', encoding='utf-8') as f:
+                last_updated = json.load(f).get("last_updated", last_updated)
+
+        data = {
+            "articles": articles,
+            "total_articles": len(articles),
+            "categories": self.categories,
+            "last_updated": last_updated
+        }
+        self._index_cache = (mtime, data)
+        return data
 
     def save_index(self, data: Dict):
-        """儲存文章索引"""
-        with open(self.index_file, 'w', encoding='utf-8') as f:
-            json.dump(data, f, ensure_ascii=False, indent=2)
+        """儲存文章索引（完整重寫JSONL，僅供重建索引使用）"""
+        lines = [json.dumps(article, separators=(',', ':')) + "\n"
+                 for article in data.get("articles", [])]
+        self._write_text(self.index_file, "".join(lines))
+        self._index_cache = None
+        self.save_index_meta(len(lines))
+
+    def save_index_meta(self, total_articles: int):
+        """儲存索引統計資訊"""
+        meta = {
+            "total_articles": total_articles,
+            "last_updated": datetime.now().isoformat()
+        }
+        self._write_text(self.index_meta_file, json.dumps(meta, separators=(',', ':')))
+
+    def export_index_pretty(self, output_path: str = None) -> str:
+        """匯出可讀版索引（供人工檢視，非熱路徑）"""
+        if output_path is None:
+            output_path = os.path.join(self.base_dir, "tools", "articles-index-pretty.json")
+        with open(output_path, 'w', encoding='utf-8') as f:
+            json.dump(self.load_index(), f, ensure_ascii=False, indent=2)
+        return output_path
 
     def update_sitemap(self):
         """更新sitemap.xml"""
@@ -262,15 +389,28 @@ class ArticleGenerator:
         # 簡化版本：重新生成整個sitemap
 
     def generate_batch_articles(self, articles_config: List[Dict]):
-        """批量生成文章"""
+        """批量生成文章（多行程平行處理，索引以JSONL追加故可併發寫入）"""
+        # 舊索引遷移在派工前於父行程做完，工作行程只需單純追加
+        self._migrate_legacy_index()
+
         created_files = []
-        for config in articles_config:
-            try:
-                filename = self.create_article(**config)
-                created_files.append(filename)
-                print(f"✓ Created: {filename}")
-            except Exception as e:
-                print(f"✗ Error creating {config.get('title', 'Unknown')}: {e}")
+        with ProcessPoolExecutor() as executor:
+            futures = {
+                executor.submit(_create_one, self.base_dir, config): config
+                for config in articles_config
+            }
+            for future in as_completed(futures):
+                config = futures[future]
+                try:
+                    filename = future.result()
+                    created_files.append(filename)
+                    print(f"✓ Created: {filename}")
+                except Exception as e:
+                    print(f"✗ Error creating {config.get('title', 'Unknown')}: {e}")
+
+        # 批次結束後統一更新索引統計
+        if created_files:
+            self.save_index_meta(self.load_index()["total_articles"])
 
         return created_files
 
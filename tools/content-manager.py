@@ -8,18 +8,54 @@
 import os
 import json
 import csv
+import re
+import mmap
 import argparse
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
 from datetime import datetime
+from functools import partial
+from heapq import nlargest
 from typing import Dict, List, Optional
 from article_generator import ArticleGenerator
 from sitemap_generator import SitemapGenerator
 
+# selectolax（C實作的HTML解析器）為可選依賴，缺少時退回正則掃描
+try:
+    from selectolax.parser import HTMLParser as _HTMLParser
+except ImportError:
+    _HTMLParser = None
+
+
+def _create_from_row(base_dir: str, row: Dict) -> Optional[str]:
+    """工作行程入口：各自建立ContentManager，sitemap交由父行程統一更新"""
+    manager = ContentManager(base_dir)
+    manager.config["automation"]["auto_update_sitemap"] = False
+    try:
+        filename = manager.create_article_from_template(**row)
+        print(f"✓ Created: {filename}")
+        return filename
+    except Exception as e:
+        print(f"✗ Error creating {row.get('title', 'Unknown')}: {e}")
+        return None
+
 class ContentManager:
+    # SEO檢查用正則：單次掃描同時擷取title、description、h1與內部連結
+    # bytes版本直接掃描mmap，不需將整份HTML解碼進記憶體
+    _SEO_RE_BYTES = re.compile(
+        rb'<title>(.*?)</title>'
+        rb'|name="description" content="([^"]*)"'
+        rb'|<h1\b'
+        rb'|href="(legal-knowledge\.html|index\.html)"',
+        re.S
+    )
+
     def __init__(self, base_dir: str = "."):
         self.base_dir = base_dir
         self.article_generator = ArticleGenerator(base_dir)
         self.sitemap_generator = SitemapGenerator(base_dir)
         self.config_file = os.path.join(base_dir, "tools", "content-config.json")
+        self._sitemap_dirty = False
         self.load_config()
 
     def load_config(self):
@@ -57,8 +93,8 @@ class ContentManager:
 
     def save_config(self):
         """儲存配置文件"""
-        with open(self.config_file, 'w', encoding='utf-8') as f:
-            json.dump(self.config, f, ensure_ascii=False, indent=2)
+        with open(self.config_file, 'wb') as f:
+            f.write(json.dumps(self.config, separators=(',', ':')).encode('utf-8'))
 
     def create_article_from_template(self,
                                    title: str,
@@ -67,10 +103,16 @@ class ContentManager:
                                    **kwargs) -> str:
         """使用模板創建文章"""
 
-        # 自動生成SEO元素
-        seo_title = title + self.config["seo"]["title_suffix"]
-        description = self.config["seo"]["description_template"].format(topic=title)
-        keywords = self.config["seo"]["default_keywords"] + kwargs.get("keywords", [])
+        # 自動生成SEO元素（先從kwargs取出，避免與明確參數重複傳遞）
+        description = kwargs.pop("description", None) or \
+            self.config["seo"]["description_template"].format(topic=title)
+        # CSV來源的keywords是逗號分隔字串，先切成清單再合併
+        extra_keywords = kwargs.pop("keywords", [])
+        if isinstance(extra_keywords, str):
+            extra_keywords = [k.strip() for k in extra_keywords.split(",") if k.strip()]
+        keywords = self.config["seo"]["default_keywords"] + extra_keywords
+        table_of_contents = kwargs.pop(
+            "table_of_contents", self.config["content"]["default_sections"])
 
         # 創建文章
         filename = self.article_generator.create_article(
@@ -79,30 +121,41 @@ class ContentManager:
             subcategory=subcategory,
             description=description,
             keywords=keywords,
-            table_of_contents=kwargs.get("table_of_contents", self.config["content"]["default_sections"]),
+            table_of_contents=table_of_contents,
             **kwargs
         )
 
-        # 自動更新sitemap
+        # 標記sitemap待更新，由呼叫端統一刷新（批量時只重生一次）
         if self.config["automation"]["auto_update_sitemap"]:
-            self.update_sitemap()
+            self._sitemap_dirty = True
 
         return filename
 
+    def flush_sitemap(self):
+        """若有文章異動，重新生成sitemap一次"""
+        if self._sitemap_dirty:
+            self.update_sitemap()
+            self._sitemap_dirty = False
+
     def batch_create_from_csv(self, csv_file: str) -> List[str]:
-        """從CSV文件批量創建文章"""
-        created_files = []
+        """從CSV文件批量創建文章（邊讀CSV邊派工給行程池）"""
+        # 舊索引遷移在派工前於父行程做完，工作行程只需單純追加
+        self.article_generator._migrate_legacy_index()
 
-        with open(csv_file, 'r', encoding='utf-8') as f:
+        worker = partial(_create_from_row, self.base_dir)
+
+        with ProcessPoolExecutor() as executor, \
+                open(csv_file, 'r', encoding='utf-8', newline='') as f:
             reader = csv.DictReader(f)
-            for row in reader:
-                try:
-                    filename = self.create_article_from_template(**row)
-                    created_files.append(filename)
-                    print(f"✓ Created: {filename}")
-                except Exception as e:
-                    print(f"✗ Error creating {row.get('title', 'Unknown')}: {e}")
+            created_files = [
+                filename
+                for filename in executor.map(worker, reader, chunksize=32)
+                if filename
+            ]
 
+        if created_files and self.config["automation"]["auto_update_sitemap"]:
+            self._sitemap_dirty = True
+        self.flush_sitemap()
         return created_files
 
     def update_sitemap(self):
@@ -118,10 +171,12 @@ class ContentManager:
         """生成內容報告"""
         index_data = self.article_generator.load_index()
 
+        articles = index_data.get("articles", [])
+
         report = {
             "generation_time": datetime.now().isoformat(),
             "statistics": {
-                "total_articles": len(index_data.get("articles", [])),
+                "total_articles": len(articles),
                 "categories": {},
                 "recent_articles": []
             },
@@ -133,19 +188,14 @@ class ContentManager:
         }
 
         # 統計分類文章數量
-        for article in index_data.get("articles", []):
-            category = article.get("category", "unknown")
-            if category not in report["statistics"]["categories"]:
-                report["statistics"]["categories"][category] = 0
-            report["statistics"]["categories"][category] += 1
-
-        # 最近文章
-        articles = sorted(
-            index_data.get("articles", []),
-            key=lambda x: x.get("date", ""),
-            reverse=True
+        report["statistics"]["categories"] = dict(
+            Counter(article.get("category", "unknown") for article in articles)
+        )
+
+        # 最近文章（取前10篇即可，不需整份排序）
+        report["statistics"]["recent_articles"] = nlargest(
+            10, articles, key=lambda x: x.get("date", "")
         )
-        report["statistics"]["recent_articles"] = articles[:10]
 
         # SEO檢查
         sitemap_path = os.path.join(self.base_dir, "sitemap.xml")
@@ -171,6 +221,49 @@ class ContentManager:
 
         return report
 
+    def _collect_seo_metrics(self, file_path: str):
+        """收集單篇文章的SEO指標：(title, description, h1數量, 內部連結數)"""
+        if _HTMLParser is not None:
+            # DOM解析一次走訪，擷取全部節點
+            with open(file_path, 'r', encoding='utf-8') as f:
+                tree = _HTMLParser(f.read())
+
+            title_node = tree.css_first('title')
+            title = title_node.text() if title_node else None
+
+            desc_node = tree.css_first('meta[name="description"]')
+            description = desc_node.attributes.get('content') if desc_node else None
+
+            h1_count = len(tree.css('h1'))
+            internal_links = sum(
+                1 for a in tree.css('a[href]')
+                if a.attributes.get('href') in ('legal-knowledge.html', 'index.html')
+            )
+            return title, description, h1_count, internal_links
+
+        # 備援路徑：以mmap掃描檔案，避免將整份HTML載入Python堆積
+        title = None
+        description = None
+        h1_count = 0
+        internal_links = 0
+
+        with open(file_path, 'rb') as f:
+            if os.fstat(f.fileno()).st_size > 0:
+                with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                    for m in self._SEO_RE_BYTES.finditer(mm):
+                        if m.group(1) is not None:
+                            if title is None:
+                                title = m.group(1).decode('utf-8', 'replace')
+                        elif m.group(2) is not None:
+                            if description is None:
+                                description = m.group(2).decode('utf-8', 'replace')
+                        elif m.group(3) is not None:
+                            internal_links += 1
+                        else:
+                            h1_count += 1
+
+        return title, description, h1_count, internal_links
+
     def optimize_article_seo(self, filename: str) -> Dict:
         """優化單篇文章SEO"""
         file_path = os.path.join(self.base_dir, filename)
@@ -179,18 +272,17 @@ class ContentManager:
             return {"error": f"File not found: {filename}"}
 
         try:
-            with open(file_path, 'r', encoding='utf-8') as f:
-                content = f.read()
-
             optimization_report = {
                 "filename": filename,
                 "checks": {},
                 "suggestions": []
             }
 
+            title, description, h1_count, internal_links = \
+                self._collect_seo_metrics(file_path)
+
             # 檢查title標籤
-            if "<title>" in content and "</title>" in content:
-                title = content.split("<title>")[1].split("</title>")[0]
+            if title is not None:
                 optimization_report["checks"]["title_length"] = len(title)
                 if len(title) > 60:
                     optimization_report["suggestions"].append("標題過長，建議控制在60字以內")
@@ -198,10 +290,7 @@ class ContentManager:
                 optimization_report["suggestions"].append("缺少title標籤")
 
             # 檢查meta description
-            if 'name="description"' in content:
-                desc_start = content.find('name="description" content="') + 29
-                desc_end = content.find('"', desc_start)
-                description = content[desc_start:desc_end] if desc_end > desc_start else ""
+            if description is not None:
                 optimization_report["checks"]["description_length"] = len(description)
                 if len(description) > 160:
                     optimization_report["suggestions"].append("描述過長，建議控制在160字以內")
@@ -209,13 +298,11 @@ class ContentManager:
                 optimization_report["suggestions"].append("缺少meta description")
 
             # 檢查h1標籤
-            h1_count = content.count("<h1")
             optimization_report["checks"]["h1_count"] = h1_count
             if h1_count != 1:
                 optimization_report["suggestions"].append(f"h1標籤數量異常({h1_count})，建議每頁只有一個h1")
 
             # 檢查內部連結
-            internal_links = content.count('href="legal-knowledge.html"') + content.count('href="index.html"')
             optimization_report["checks"]["internal_links"] = internal_links
             if internal_links < 3:
                 optimization_report["suggestions"].append("內部連結過少，建議增加相關頁面連結")
@@ -225,43 +312,39 @@ class ContentManager:
         except Exception as e:
             return {"error": f"Error analyzing {filename}: {e}"}
 
-    def backup_content(self, backup_dir: str = "backups") -> str:
-        """備份所有內容"""
-        import shutil
+    def backup_content(self, backup_dir: str = "backups", compresslevel: int = 1) -> str:
+        """備份所有內容（直接寫入ZIP，不經過暫存目錄）
+
+        zlib壓縮為單執行緒CPU瓶頸，預設compresslevel=1以速度優先；
+        傳入0則改用ZIP_STORED完全不壓縮。
+        """
         import zipfile
 
         timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-        backup_name = f"content_backup_{timestamp}"
-        backup_path = os.path.join(backup_dir, backup_name)
+        zip_path = os.path.join(backup_dir, f"content_backup_{timestamp}.zip")
 
         os.makedirs(backup_dir, exist_ok=True)
 
-        # 創建備份目錄
-        os.makedirs(backup_path, exist_ok=True)
-
-        # 備份HTML文件
-        for file in os.listdir(self.base_dir):
-            if file.endswith('.html'):
-                shutil.copy2(os.path.join(self.base_dir, file), backup_path)
-
-        # 備份tools和templates目錄
-        for dir_name in ['tools', 'templates']:
-            src_dir = os.path.join(self.base_dir, dir_name)
-            if os.path.exists(src_dir):
-                dst_dir = os.path.join(backup_path, dir_name)
-                shutil.copytree(src_dir, dst_dir)
-
-        # 創建ZIP文件
-        zip_path = f"{backup_path}.zip"
-        with zipfile.ZipFile(zip_path, 'w', zipfile.ZIP_DEFLATED) as zipf:
-            for root, dirs, files in os.walk(backup_path):
-                for file in files:
-                    file_path = os.path.join(root, file)
-                    arcname = os.path.relpath(file_path, backup_path)
-                    zipf.write(file_path, arcname)
-
-        # 刪除臨時目錄
-        shutil.rmtree(backup_path)
+        if compresslevel:
+            compression, level = zipfile.ZIP_DEFLATED, compresslevel
+        else:
+            compression, level = zipfile.ZIP_STORED, None
+
+        with zipfile.ZipFile(zip_path, 'w', compression, compresslevel=level) as zipf:
+            # 備份HTML文件（scandir的DirEntry已快取檔案類型，免去逐檔stat）
+            with os.scandir(self.base_dir) as it:
+                for entry in it:
+                    if entry.is_file(follow_symlinks=False) and entry.name.endswith('.html'):
+                        zipf.write(entry.path, entry.name)
+
+            # 備份tools和templates目錄
+            for dir_name in ['tools', 'templates']:
+                src_dir = os.path.join(self.base_dir, dir_name)
+                if os.path.exists(src_dir):
+                    for root, dirs, files in os.walk(src_dir):
+                        for file in files:
+                            file_path = os.path.join(root, file)
+                            zipf.write(file_path, os.path.relpath(file_path, self.base_dir))
 
         return zip_path
 
@@ -350,6 +433,7 @@ def main():
             subcategory=args.subcategory,
             subtitle=args.subtitle or ""
         )
+        manager.flush_sitemap()
         print(f"✓ 文章已創建: {filename}")
 
     elif args.command == 'batch':
@@ -5,18 +5,103 @@
 自動生成分類文章索引頁面和導航系統
 """
 
+import html
 import os
 import json
 import re
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, asdict
 from datetime import datetime
+from operator import attrgetter
+from xml.sax.saxutils import escape
 from typing import Dict, List
 from article_generator import ArticleGenerator
 
+
+@dataclass(slots=True)
+class ArticleInfo:
+    """單篇文章的索引資料（slots實例較dict省記憶體、屬性存取較快）"""
+    filename: str
+    title: str
+    description: str
+    category: str
+    date: str
+    url: str
+    # 進入HTML情境的欄位於建構時轉義一次，各渲染端重複取用免逐次轉義
+    title_html: str = ""
+    description_html: str = ""
+    filename_attr: str = ""
+
+    def __post_init__(self):
+        if not self.title_html:
+            self.title_html = html.escape(self.title)
+        if not self.description_html:
+            self.description_html = html.escape(self.description)
+        if not self.filename_attr:
+            self.filename_attr = html.escape(self.filename, quote=True)
+
+# HTML解析器為可選依賴，依速度擇優：selectolax(Lexbor) > lxml > 正則備援。
+# 這裡每檔只取三個節點，Lexbor這類selector-only解析器最划算
+try:
+    from selectolax.lexbor import LexborHTMLParser as _LexborHTMLParser
+except ImportError:
+    _LexborHTMLParser = None
+
+try:
+    from lxml import etree as _lxml_etree
+    from lxml import html as _lxml_html
+except ImportError:
+    _lxml_html = None
+
+# Jinja2為可選依賴：模板編譯一次為bytecode後重複渲染，缺少時以f-string組版
+try:
+    from jinja2 import Environment, FileSystemLoader
+except ImportError:
+    Environment = None
+
+# 檔名關鍵字→分類對照表與單一合併正則（一次C層掃描取代逐一子字串比對）
+_CAT_MAP = {
+    'inheritance': 'inheritance', 'estate': 'inheritance', 'will': 'inheritance',
+    'real-estate': 'real-estate', 'property': 'real-estate', 'mortgage': 'real-estate',
+    'family': 'family-law', 'divorce': 'family-law', 'custody': 'family-law',
+    'criminal': 'criminal-law',
+    'corporate': 'corporate-law', 'company': 'corporate-law',
+    'labor': 'labor-law', 'employment': 'labor-law',
+    'tax': 'tax-law',
+}
+# 長關鍵字優先，避免"real-estate"被"estate"搶先匹配
+_CAT_RE = re.compile('|'.join(
+    map(re.escape, sorted(_CAT_MAP, key=len, reverse=True))))
+# 檔名命中多個分類時依此優先序取捨（沿用原if/elif鏈的分支順序）
+_CAT_PRIORITY = {c: i for i, c in enumerate((
+    'inheritance', 'real-estate', 'family-law', 'criminal-law',
+    'corporate-law', 'labor-law', 'tax-law'))}
+
+# 正則備援路徑使用的模式（模組載入時編譯一次）
+_TITLE_RE = re.compile(r'<title>(.*?)</title>')
+_DESC_RE = re.compile(r'name="description" content="(.*?)"')
+_H1_RE = re.compile(r'<h1[^>]*>(.*?)</h1>', re.DOTALL)
+_TAG_RE = re.compile(r'<[^>]+>')
+
 class IndexGenerator:
     def __init__(self, base_dir: str = "."):
         self.base_dir = base_dir
         self.article_generator = ArticleGenerator(base_dir)
         self.template_dir = os.path.join(base_dir, "templates")
+        # 解析結果側錄快取：以(mtime_ns, size)為鍵，未變動的檔案免重新解析
+        self.metadata_cache_file = os.path.join(base_dir, "tools", ".article-index.json")
+
+        # 已編譯的Jinja2模板（卡片與頁面外殼），建立一次重複渲染
+        self._card_tpl = None
+        self._page_tpl = None
+        if Environment is not None:
+            env = Environment(loader=FileSystemLoader(self.template_dir),
+                              auto_reload=False, cache_size=-1)
+            if os.path.exists(os.path.join(self.template_dir, "article-card.html.j2")):
+                self._card_tpl = env.get_template("article-card.html.j2")
+            if os.path.exists(os.path.join(self.template_dir, "legal-knowledge.html.j2")):
+                self._page_tpl = env.get_template("legal-knowledge.html.j2")
 
         # 分類標題映射
         self.category_titles = {
@@ -30,130 +115,211 @@ class IndexGenerator:
             "tax-law": "稅法"
         }
 
+    def _load_metadata_cache(self) -> Dict:
+        """載入解析結果快取"""
+        try:
+            with open(self.metadata_cache_file, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def _save_metadata_cache(self, cache: Dict):
+        """原子性寫回解析結果快取（temp + os.replace）"""
+        tmp_path = self.metadata_cache_file + ".tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(cache, f, ensure_ascii=False)
+        os.replace(tmp_path, self.metadata_cache_file)
+
     def scan_existing_articles(self) -> Dict:
-        """掃描現有文章"""
+        """掃描現有文章（未變動的檔案直接取用側錄快取）"""
         articles_data = {
             "articles": [],
             "categories": {},
             "total": 0
         }
 
-        # 掃描根目錄的文章
-        for filename in os.listdir(self.base_dir):
-            if filename.startswith("article-") and filename.endswith(".html"):
-                article_info = self.extract_article_info(filename)
-                if article_info:
-                    articles_data["articles"].append(article_info)
-
-        # 按分類組織
+        cache = self._load_metadata_cache()
+        cache_dirty = False
+
+        # 掃描根目錄的文章（scandir的DirEntry帶有快取的stat資訊）
+        entries = []
+        with os.scandir(self.base_dir) as it:
+            for entry in it:
+                if entry.name.startswith("article-") and entry.name.endswith(".html"):
+                    entries.append(entry)
+
+        # 先分流快取命中與待解析的檔案
+        results = {}
+        to_parse = []
+        for entry in entries:
+            stat = entry.stat(follow_symlinks=False)
+            key = [stat.st_mtime_ns, stat.st_size]
+            cached = cache.get(entry.name)
+            if cached and cached["key"] == key:
+                results[entry.name] = ArticleInfo(**cached["info"])
+            else:
+                to_parse.append((entry, key))
+
+        # 解析為I/O與輕量CPU混合工作，執行緒池可近線性加速
+        if to_parse:
+            max_workers = min(32, (os.cpu_count() or 4) * 4)
+            with ThreadPoolExecutor(max_workers=max_workers) as executor:
+                infos = executor.map(self.extract_article_info,
+                                     (entry for entry, _ in to_parse))
+                for (entry, key), article_info in zip(to_parse, infos):
+                    if article_info:
+                        results[entry.name] = article_info
+                        cache[entry.name] = {"key": key, "info": asdict(article_info)}
+                        cache_dirty = True
+
+        for entry in entries:
+            article_info = results.get(entry.name)
+            if article_info:
+                articles_data["articles"].append(article_info)
+
+        if cache_dirty:
+            self._save_metadata_cache(cache)
+
+        # 全域按日期排序一次後再分組；dict保留插入順序，
+        # 各分類清單因此天然有序，免去逐分類重排
+        articles_data["articles"].sort(key=attrgetter("date"), reverse=True)
+
+        categories = defaultdict(list)
         for article in articles_data["articles"]:
-            category = article["category"]
-            if category not in articles_data["categories"]:
-                articles_data["categories"][category] = []
-            articles_data["categories"][category].append(article)
+            categories[article.category].append(article)
+        articles_data["categories"] = dict(categories)
 
         articles_data["total"] = len(articles_data["articles"])
 
-        # 按日期排序
-        for category in articles_data["categories"]:
-            articles_data["categories"][category].sort(
-                key=lambda x: x.get("date", ""), reverse=True
-            )
-
         return articles_data
 
-    def extract_article_info(self, filename: str) -> Dict:
-        """從文章文件中提取信息"""
-        file_path = os.path.join(self.base_dir, filename)
-
+    def extract_article_info(self, entry) -> ArticleInfo:
+        """從文章文件中提取信息（接受os.DirEntry或檔名字串）"""
         try:
-            with open(file_path, 'r', encoding='utf-8') as f:
-                content = f.read()
+            if isinstance(entry, os.DirEntry):
+                # DirEntry的stat已由scandir快取，不會再發syscall
+                filename = entry.name
+                file_path = entry.path
+                mtime = entry.stat(follow_symlinks=False).st_mtime
+            else:
+                filename = entry
+                file_path = os.path.join(self.base_dir, filename)
+                mtime = os.path.getmtime(file_path)
 
-            # 提取標題
-            title_match = re.search(r'<title>(.*?)</title>', content)
-            title = title_match.group(1) if title_match else filename
-
-            # 提取描述
-            desc_match = re.search(r'name="description" content="(.*?)"', content)
-            description = desc_match.group(1) if desc_match else ""
-
-            # 提取H1標題（文章實際標題）
-            h1_match = re.search(r'<h1[^>]*>(.*?)</h1>', content, re.DOTALL)
-            article_title = h1_match.group(1).strip() if h1_match else title
-
-            # 移除HTML標籤
-            article_title = re.sub(r'<[^>]+>', '', article_title)
+            with open(file_path, 'r', encoding='utf-8') as f:
+                # 所需的title/meta/h1都在檔案開頭，先讀32KB即可；
+                # 只有h1不在開頭區時才補讀其餘內容
+                content = f.read(32768)
+                if '<h1' not in content or '</h1>' not in content:
+                    content += f.read()
+
+            parsed = False
+            if _LexborHTMLParser is not None:
+                tree = _LexborHTMLParser(content)
+
+                title_node = tree.css_first('title')
+                title = title_node.text() if title_node else filename
+
+                desc_node = tree.css_first('meta[name="description"]')
+                description = desc_node.attributes.get('content', '') if desc_node else ''
+
+                # .text()已回傳去除標籤的純文字
+                h1_node = tree.css_first('h1')
+                article_title = h1_node.text().strip() if h1_node else title
+                parsed = True
+            elif _lxml_html is not None:
+                try:
+                    doc = _lxml_html.fromstring(content)
+                    title = doc.findtext('.//title') or filename
+                    description = doc.xpath('string(//meta[@name="description"]/@content)')
+                    # string(//h1)已回傳去除標籤的純文字
+                    article_title = doc.xpath('string(//h1)').strip() or title
+                    parsed = True
+                except _lxml_etree.ParserError:
+                    pass
+
+            if not parsed:
+                # 提取標題
+                title_match = _TITLE_RE.search(content)
+                title = title_match.group(1) if title_match else filename
+
+                # 提取描述
+                desc_match = _DESC_RE.search(content)
+                description = desc_match.group(1) if desc_match else ""
+
+                # 提取H1標題（文章實際標題）
+                h1_match = _H1_RE.search(content)
+                article_title = h1_match.group(1).strip() if h1_match else title
+
+                # 移除HTML標籤（多數H1不含內嵌標籤，先以子字串檢查省掉正則呼叫）
+                if '<' in article_title:
+                    article_title = _TAG_RE.sub('', article_title)
 
             # 從檔名推斷分類
             category = self.infer_category_from_filename(filename)
 
             # 獲取文件修改日期
-            timestamp = os.path.getmtime(file_path)
-            date = datetime.fromtimestamp(timestamp).strftime("%Y-%m-%d")
-
-            return {
-                "filename": filename,
-                "title": article_title,
-                "description": description,
-                "category": category,
-                "date": date,
-                "url": f"https://lawyer880.com/{filename}"
-            }
+            date = datetime.fromtimestamp(mtime).strftime("%Y-%m-%d")
+
+            return ArticleInfo(
+                filename=filename,
+                title=article_title,
+                description=description,
+                category=category,
+                date=date,
+                url=f"https://lawyer880.com/{filename}"
+            )
 
         except Exception as e:
             print(f"Error processing {filename}: {e}")
             return None
 
     def infer_category_from_filename(self, filename: str) -> str:
-        """從檔名推斷文章分類"""
-        filename_lower = filename.lower()
-
-        if "inheritance" in filename_lower or "estate" in filename_lower or "will" in filename_lower:
-            return "inheritance"
-        elif "real-estate" in filename_lower or "property" in filename_lower or "mortgage" in filename_lower:
-            return "real-estate"
-        elif "family" in filename_lower or "divorce" in filename_lower or "custody" in filename_lower:
-            return "family-law"
-        elif "criminal" in filename_lower:
-            return "criminal-law"
-        elif "corporate" in filename_lower or "company" in filename_lower:
-            return "corporate-law"
-        elif "labor" in filename_lower or "employment" in filename_lower:
-            return "labor-law"
-        elif "tax" in filename_lower:
-            return "tax-law"
-        else:
-            return "civil-law"  # 預設分類
-
-    def generate_article_card_html(self, article: Dict) -> str:
-        """生成文章卡片HTML"""
+        """從檔名推斷文章分類（多個關鍵字命中時取優先序最高的分類）"""
+        cats = {_CAT_MAP[m.group(0)] for m in _CAT_RE.finditer(filename.lower())}
+        if not cats:
+            return "civil-law"  # 無匹配時的預設分類
+        return min(cats, key=_CAT_PRIORITY.__getitem__)
+
+    def generate_article_card_html(self, article: ArticleInfo,
+                                   category_title: str = None) -> str:
+        """生成文章卡片HTML（呼叫端可傳入已查好的分類標題，避免逐卡重查）"""
+        if category_title is None:
+            category_title = self.category_titles.get(article.category, article.category)
+
+        if self._card_tpl is not None:
+            return self._card_tpl.render(article=article, category_title=category_title)
+
         return f'''
             <div class="bg-white p-6 border border-gray-200 hover:shadow-lg transition-shadow duration-300">
                 <div class="mb-3">
                     <span class="inline-block bg-accent-gold text-primary-dark px-3 py-1 text-sm font-medium rounded">
-                        {self.category_titles.get(article["category"], article["category"])}
+                        {category_title}
                     </span>
                 </div>
                 <h3 class="text-xl font-bold text-primary-dark mb-3 hover:text-accent-gold">
-                    <a href="{article["filename"]}" class="block">{article["title"]}</a>
+                    <a href="{article.filename_attr}" class="block">{article.title_html}</a>
                 </h3>
-                <p class="text-gray-600 mb-4 line-clamp-3">{article["description"]}</p>
+                <p class="text-gray-600 mb-4 line-clamp-3">{article.description_html}</p>
                 <div class="flex justify-between items-center">
-                    <span class="text-sm text-gray-500">{article["date"]}</span>
-                    <a href="{article["filename"]}" class="text-accent-gold hover:text-yellow-600 font-medium">
+                    <span class="text-sm text-gray-500">{article.date}</span>
+                    <a href="{article.filename_attr}" class="text-accent-gold hover:text-yellow-600 font-medium">
                         閱讀更多 →
                     </a>
                 </div>
             </div>'''
 
-    def generate_category_section_html(self, category: str, articles: List[Dict]) -> str:
+    def generate_category_section_html(self, category: str, articles: List[ArticleInfo],
+                                       category_title: str = None) -> str:
         """生成分類區塊HTML"""
-        category_title = self.category_titles.get(category, category)
+        if category_title is None:
+            category_title = self.category_titles.get(category, category)
 
-        articles_html = ""
-        for article in articles:
-            articles_html += self.generate_article_card_html(article)
+        # 同一分類的卡片共用標題，查一次傳下去
+        articles_html = "".join(
+            self.generate_article_card_html(article, category_title)
+            for article in articles
+        )
 
         return f'''
             <section id="{category}" class="mb-16">
@@ -168,17 +334,20 @@ class IndexGenerator:
                 </div>
             </section>'''
 
-    def generate_category_navigation(self, categories: Dict) -> str:
+    def generate_category_navigation(self, categories: Dict,
+                                     display: Dict = None) -> str:
         """生成分類導航"""
-        nav_items = ""
-
+        if display is None:
+            display = self.category_titles
+        nav_parts = []
         for category, articles in categories.items():
-            category_title = self.category_titles.get(category, category)
-            nav_items += f'''
+            category_title = display.get(category, category)
+            nav_parts.append(f'''
                 <a href="#{category}" class="flex items-center justify-between p-4 bg-white border border-gray-200 hover:bg-gray-50 transition-colors duration-300">
                     <span class="font-medium text-primary-dark">{category_title}</span>
                     <span class="bg-accent-gold text-primary-dark px-2 py-1 rounded text-sm">{len(articles)}</span>
-                </a>'''
+                </a>''')
+        nav_items = "".join(nav_parts)
 
         return f'''
             <div class="bg-gray-50 p-8 mb-12">
@@ -232,51 +401,46 @@ class IndexGenerator:
         """更新法律知識頁面"""
         articles_data = self.scan_existing_articles()
 
+        # 每個分類的顯示標題先查好一次，後續導航與各卡片直接取用
+        display = {c: self.category_titles.get(c, c)
+                   for c in articles_data["categories"]}
+
         # 生成各個區塊
         search_section = self.generate_search_section()
-        navigation = self.generate_category_navigation(articles_data["categories"])
+        navigation = self.generate_category_navigation(
+            articles_data["categories"], display)
 
-        categories_html = ""
-        for category, articles in articles_data["categories"].items():
-            categories_html += self.generate_category_section_html(category, articles)
+        categories_html = "".join(
+            self.generate_category_section_html(category, articles, display[category])
+            for category, articles in articles_data["categories"].items()
+        )
 
-        # 讀取現有的legal-knowledge.html並更新內容
+        # 頁面內容整頁重新生成，舊檔不需先讀回；
+        # 以temp + os.replace原子性覆寫，避免寫入中斷留下半成品
         legal_knowledge_path = os.path.join(self.base_dir, "legal-knowledge.html")
 
-        if os.path.exists(legal_knowledge_path):
-            with open(legal_knowledge_path, 'r', encoding='utf-8') as f:
-                content = f.read()
-
-            # 找到主要內容區域並替換
-            # 這裡需要根據實際的HTML結構來調整
-            new_main_content = f'''
-                {search_section}
-                {navigation}
-                <div class="max-w-6xl mx-auto px-6">
-                    {categories_html}
-                </div>'''
-
-            # 簡化版本：創建新的legal-knowledge.html
-            updated_content = self.create_complete_legal_knowledge_page(
-                search_section, navigation, categories_html, articles_data["total"]
-            )
-
-            with open(legal_knowledge_path, 'w', encoding='utf-8') as f:
-                f.write(updated_content)
-        else:
-            # 創建新的頁面
-            updated_content = self.create_complete_legal_knowledge_page(
-                search_section, navigation, categories_html, articles_data["total"]
-            )
+        updated_content = self.create_complete_legal_knowledge_page(
+            search_section, navigation, categories_html, articles_data["total"]
+        )
 
-            with open(legal_knowledge_path, 'w', encoding='utf-8') as f:
-                f.write(updated_content)
+        tmp_path = legal_knowledge_path + ".tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            f.write(updated_content)
+        os.replace(tmp_path, legal_knowledge_path)
 
         return legal_knowledge_path
 
     def create_complete_legal_knowledge_page(self, search_section: str, navigation: str,
                                            categories_html: str, total_articles: int) -> str:
         """創建完整的法律知識頁面"""
+        if self._page_tpl is not None:
+            return self._page_tpl.render(
+                search_section=search_section,
+                navigation=navigation,
+                categories_html=categories_html,
+                total_articles=total_articles
+            )
+
         return f'''<!DOCTYPE html>
 <html lang="zh-TW">
 <head>
@@ -364,38 +528,37 @@ class IndexGenerator:
 </html>'''
 
     def generate_sitemap_index(self) -> str:
-        """生成文章sitemap索引"""
+        """生成文章sitemap索引（逐URL寫出，避免在記憶體累積整份XML字串）"""
         articles_data = self.scan_existing_articles()
+        today = datetime.now().strftime("%Y-%m-%d")
 
-        sitemap_content = '''<?xml version="1.0" encoding="UTF-8"?>
+        sitemap_path = os.path.join(self.base_dir, "sitemap.xml")
+        with open(sitemap_path, 'w', encoding='utf-8') as f:
+            f.write(f'''<?xml version="1.0" encoding="UTF-8"?>
 <urlset xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">
   <url>
     <loc>https://lawyer880.com/</loc>
-    <lastmod>''' + datetime.now().strftime("%Y-%m-%d") + '''</lastmod>
+    <lastmod>{today}</lastmod>
     <changefreq>weekly</changefreq>
     <priority>1.0</priority>
   </url>
   <url>
     <loc>https://lawyer880.com/legal-knowledge.html</loc>
-    <lastmod>''' + datetime.now().strftime("%Y-%m-%d") + '''</lastmod>
+    <lastmod>{today}</lastmod>
     <changefreq>weekly</changefreq>
     <priority>0.9</priority>
-  </url>'''
+  </url>''')
 
-        for article in articles_data["articles"]:
-            sitemap_content += f'''
+            for article in articles_data["articles"]:
+                f.write(f'''
   <url>
-    <loc>{article["url"]}</loc>
-    <lastmod>{article["date"]}</lastmod>
+    <loc>{escape(article.url)}</loc>
+    <lastmod>{article.date}</lastmod>
     <changefreq>monthly</changefreq>
     <priority>0.6</priority>
-  </url>'''
-
-        sitemap_content += '\n</urlset>'
+  </url>''')
 
-        sitemap_path = os.path.join(self.base_dir, "sitemap.xml")
-        with open(sitemap_path, 'w', encoding='utf-8') as f:
-            f.write(sitemap_content)
+            f.write('\n</urlset>')
 
         return sitemap_path
 
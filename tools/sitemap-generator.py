@@ -6,10 +6,17 @@ Sitemap 自動生成器
 """
 
 import os
-import glob
 import xml.etree.ElementTree as ET
-from datetime import datetime
+from datetime import date, datetime
+from functools import lru_cache
 from urllib.parse import urljoin
+from xml.sax.saxutils import escape
+
+
+@lru_cache(maxsize=None)
+def _fmt_date(day: date) -> str:
+    """格式化日期字串，以本地日期為鍵快取（同一天修改的檔案共用結果）"""
+    return day.strftime("%Y-%m-%d")
 
 class SitemapGenerator:
     def __init__(self, base_dir: str = ".", domain: str = "https://lawyer880.com"):
@@ -34,32 +41,64 @@ class SitemapGenerator:
             "article-template.html"
         }
 
-    def scan_html_files(self) -> list:
-        """掃描所有HTML文件"""
+        # 依頁面類型的預設SEO配置
+        self.type_configs = {
+            "homepage": {"priority": "1.0", "changefreq": "weekly"},
+            "service": {"priority": "0.9", "changefreq": "monthly"},
+            "info": {"priority": "0.8", "changefreq": "monthly"},
+            "knowledge": {"priority": "0.8", "changefreq": "weekly"},
+            "article": {"priority": "0.6", "changefreq": "monthly"},
+            "other": {"priority": "0.5", "changefreq": "monthly"}
+        }
+        self._default_config = {"priority": "0.5", "changefreq": "monthly"}
+
+        # 同一次執行內的掃描結果與URL數量快取（generate→report免重掃/重解析）
+        self._scanned = None
+        self._url_count = None
+
+    def _scandir_html(self, root: str):
+        """遞迴走訪root，逐一產出.html檔案的DirEntry"""
+        with os.scandir(root) as it:
+            for entry in it:
+                if entry.is_dir(follow_symlinks=False):
+                    yield from self._scandir_html(entry.path)
+                elif entry.is_file() and not entry.is_symlink() \
+                        and entry.name.endswith('.html'):
+                    # is_file/is_symlink讀取scandir快取的dirent類型，不另發stat
+                    yield entry
+
+    def scan_html_files(self, refresh: bool = False) -> list:
+        """掃描所有HTML文件（同一實例內結果快取，refresh=True時重掃）"""
+        if self._scanned is not None and not refresh:
+            return self._scanned
+
         html_files = []
 
         # 掃描根目錄的HTML文件
-        root_files = glob.glob(os.path.join(self.base_dir, "*.html"))
-        for file_path in root_files:
-            filename = os.path.basename(file_path)
-            if filename not in self.excluded_files:
-                html_files.append({
-                    "path": filename,
-                    "full_path": file_path,
-                    "type": self.classify_page(filename)
-                })
+        with os.scandir(self.base_dir) as it:
+            for entry in it:
+                if entry.is_file() and not entry.is_symlink() \
+                        and entry.name.endswith('.html') \
+                        and entry.name not in self.excluded_files:
+                    html_files.append({
+                        "path": entry.name,
+                        "full_path": entry.path,
+                        "entry": entry,
+                        "type": self.classify_page(entry.name)
+                    })
 
         # 掃描articles目錄的HTML文件
-        articles_pattern = os.path.join(self.base_dir, "articles", "**", "*.html")
-        article_files = glob.glob(articles_pattern, recursive=True)
-        for file_path in article_files:
-            rel_path = os.path.relpath(file_path, self.base_dir)
-            html_files.append({
-                "path": rel_path,
-                "full_path": file_path,
-                "type": "article"
-            })
+        articles_dir = os.path.join(self.base_dir, "articles")
+        if os.path.isdir(articles_dir):
+            for entry in self._scandir_html(articles_dir):
+                html_files.append({
+                    "path": os.path.relpath(entry.path, self.base_dir),
+                    "full_path": entry.path,
+                    "entry": entry,
+                    "type": "article"
+                })
 
+        self._scanned = html_files
         return html_files
 
     def classify_page(self, filename: str) -> str:
@@ -77,99 +116,60 @@ class SitemapGenerator:
         else:
             return "other"
 
-    def get_file_modification_date(self, file_path: str) -> str:
-        """獲取文件修改日期"""
+    def get_file_modification_date(self, file_entry) -> str:
+        """獲取文件修改日期（接受os.DirEntry或路徑字串）"""
         try:
-            timestamp = os.path.getmtime(file_path)
-            return datetime.fromtimestamp(timestamp).strftime("%Y-%m-%d")
+            if isinstance(file_entry, os.DirEntry):
+                timestamp = file_entry.stat().st_mtime
+            else:
+                timestamp = os.path.getmtime(file_entry)
+            return _fmt_date(date.fromtimestamp(timestamp))
         except:
             return datetime.now().strftime("%Y-%m-%d")
 
     def get_page_config(self, filename: str, page_type: str) -> dict:
-        """獲取頁面SEO配置"""
-        if filename in self.page_priorities:
-            return self.page_priorities[filename]
-
-        # 根據頁面類型設定預設值
-        type_configs = {
-            "homepage": {"priority": "1.0", "changefreq": "weekly"},
-            "service": {"priority": "0.9", "changefreq": "monthly"},
-            "info": {"priority": "0.8", "changefreq": "monthly"},
-            "knowledge": {"priority": "0.8", "changefreq": "weekly"},
-            "article": {"priority": "0.6", "changefreq": "monthly"},
-            "other": {"priority": "0.5", "changefreq": "monthly"}
-        }
-
-        return type_configs.get(page_type, {"priority": "0.5", "changefreq": "monthly"})
+        """獲取頁面SEO配置（檔名優先，其次頁面類型預設值）"""
+        return self.page_priorities.get(filename) \
+            or self.type_configs.get(page_type, self._default_config)
 
     def generate_sitemap(self) -> str:
-        """生成sitemap.xml"""
-        # 建立XML根元素
-        urlset = ET.Element("urlset")
-        urlset.set("xmlns", "http://www.sitemaps.org/schemas/sitemap/0.9")
-
-        # 掃描所有HTML文件
+        """生成sitemap.xml（輸出格式固定，直接逐URL寫出字串即可，不需建構XML樹）"""
         html_files = self.scan_html_files()
 
-        for file_info in html_files:
-            url_element = ET.SubElement(urlset, "url")
-
-            # URL位置
-            loc = ET.SubElement(url_element, "loc")
-            file_url = urljoin(self.domain + "/", file_info["path"])
-            loc.text = file_url
-
-            # 最後修改日期
-            lastmod = ET.SubElement(url_element, "lastmod")
-            lastmod.text = self.get_file_modification_date(file_info["full_path"])
-
-            # 獲取頁面配置
-            config = self.get_page_config(os.path.basename(file_info["path"]), file_info["type"])
-
-            # 更新頻率
-            changefreq = ET.SubElement(url_element, "changefreq")
-            changefreq.text = config["changefreq"]
+        with open(self.sitemap_path, 'w', encoding='utf-8') as f:
+            f.write('<?xml version="1.0" encoding="UTF-8"?>\n')
+            f.write('<urlset xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">\n')
 
-            # 優先級
-            priority = ET.SubElement(url_element, "priority")
-            priority.text = config["priority"]
+            for file_info in html_files:
+                # 只有URL需要轉義，其餘欄位皆為受控值
+                file_url = escape(urljoin(self.domain + "/", file_info["path"]))
+                lastmod = self.get_file_modification_date(file_info["entry"])
+                config = self.get_page_config(
+                    os.path.basename(file_info["path"]), file_info["type"])
 
-        # 生成XML樹
-        tree = ET.ElementTree(urlset)
+                f.write(f'''  <url>
+    <loc>{file_url}</loc>
+    <lastmod>{lastmod}</lastmod>
+    <changefreq>{config["changefreq"]}</changefreq>
+    <priority>{config["priority"]}</priority>
+  </url>
+''')
 
-        # 設定XML格式化
-        self.indent_xml(urlset)
-
-        # 寫入檔案
-        with open(self.sitemap_path, 'wb') as f:
-            f.write(b'<?xml version="1.0" encoding="UTF-8"?>\n')
-            tree.write(f, encoding='utf-8', xml_declaration=False)
+            f.write('</urlset>\n')
 
+        self._url_count = len(html_files)
         return self.sitemap_path
 
-    def indent_xml(self, elem, level=0):
-        """格式化XML縮排"""
-        i = "\n" + level * "  "
-        if len(elem):
-            if not elem.text or not elem.text.strip():
-                elem.text = i + "  "
-            if not elem.tail or not elem.tail.strip():
-                elem.tail = i
-            for elem in elem:
-                self.indent_xml(elem, level + 1)
-            if not elem.tail or not elem.tail.strip():
-                elem.tail = i
-        else:
-            if level and (not elem.tail or not elem.tail.strip()):
-                elem.tail = i
-
     def validate_sitemap(self) -> dict:
-        """驗證sitemap格式"""
+        """驗證sitemap格式（同一次執行剛生成過時直接取用已知的URL數）"""
         try:
-            tree = ET.parse(self.sitemap_path)
-            root = tree.getroot()
-
-            url_count = len(root.findall(".//{http://www.sitemaps.org/schemas/sitemap/0.9}url"))
+            if self._url_count is not None:
+                url_count = self._url_count
+            else:
+                tree = ET.parse(self.sitemap_path)
+                root = tree.getroot()
+                url_count = len(root.findall(
+                    ".//{http://www.sitemaps.org/schemas/sitemap/0.9}url"))
 
             return {
                 "valid": True,